@@ -0,0 +1,174 @@
+"""Binary-to-text encoders shared by the API and its encode pool processes
+
+Kept free of FastAPI and other app imports so spawned pool children only
+load what encoding needs; Numba is imported lazily on first yEnc use.
+"""
+import base64
+import binascii
+import os
+import threading
+from enum import Enum
+from typing import Optional, Union
+
+try:
+    # SIMD (AVX2/AVX-512/NEON) base64 codec; falls back to the scalar stdlib encoder
+    from pybase64 import b64encode, get_version as get_pybase64_version
+    BASE64_CODEC = f"pybase64 {get_pybase64_version()}"  # Names the active SIMD codec
+except ImportError:
+    from base64 import b64encode
+    BASE64_CODEC = "stdlib base64 (scalar)"
+
+try:
+    # Vectorized yEnc kernel; falls back to a per-byte Python loop
+    import numpy as np
+except ImportError:
+    np = None
+
+class EncodingType(str, Enum):
+    BASE64 = "base64"
+    HEX = "hex"
+    BASE32 = "base32"
+    BASE85 = "base85"
+    UUENCODE = "uuencode"
+    YENC = "yenc"
+
+YENC_BLOCK_SIZE = 1024 * 1024  # Bytes per NumPy yEnc pass (bounds the int64 index arrays)
+
+def yenc_encode_numpy(data: bytes) -> bytes:
+    """yEnc-encode with whole-array NumPy operations instead of a per-byte loop
+
+    Each input byte lands at its own index plus the number of escapes up to and
+    including it; escaped bytes get their 0x3D escape written one slot earlier.
+    """
+    parts = []
+    view = memoryview(data)
+    for offset in range(0, len(view), YENC_BLOCK_SIZE):
+        shifted = np.frombuffer(view[offset:offset + YENC_BLOCK_SIZE], dtype=np.uint8) + np.uint8(42)  # uint8 wraps mod 256
+        # Escape special characters: NULL, LF, CR, =
+        mask = (shifted == 0x00) | (shifted == 0x0A) | (shifted == 0x0D) | (shifted == 0x3D)
+        positions = np.arange(len(shifted)) + np.cumsum(mask)
+        out = np.empty(len(shifted) + int(np.count_nonzero(mask)), dtype=np.uint8)
+        out[positions] = np.where(mask, shifted + np.uint8(64), shifted)
+        out[positions[mask] - 1] = 0x3D
+        parts.append(out.tobytes())
+    return b''.join(parts)
+
+def _yenc_loop(src, dst):
+    """Write yEnc output for src into dst (sized 2x) and return its length"""
+    j = 0
+    for i in range(src.size):
+        b = (src[i] + 42) & 0xFF
+        if b == 0x00 or b == 0x0A or b == 0x0D or b == 0x3D:
+            dst[j] = 0x3D
+            dst[j + 1] = (b + 64) & 0xFF
+            j += 2
+        else:
+            dst[j] = b
+            j += 1
+    return j
+
+_yenc_kernel = None
+_yenc_kernel_loaded = False
+_yenc_kernel_lock = threading.Lock()
+
+def load_yenc_kernel():
+    """Compile the yEnc loop with Numba on first use; None when Numba is missing
+
+    Numba adds ~60MB per process, so it isn't imported with this module: pool
+    children only load it once they encode a yEnc block. The web process
+    loads it at startup instead (warm_yenc_kernel in main), so the first yEnc
+    request doesn't wait for the compile.
+    """
+    global _yenc_kernel, _yenc_kernel_loaded
+    if _yenc_kernel_loaded:
+        return _yenc_kernel
+    with _yenc_kernel_lock:
+        if not _yenc_kernel_loaded:
+            if np is not None:
+                try:
+                    # Compiles the yEnc loop to machine code; falls back to the NumPy kernel
+                    from numba import njit
+                    _yenc_kernel = njit(cache=True, boundscheck=False)(_yenc_loop)
+                except ImportError:
+                    pass
+            _yenc_kernel_loaded = True
+    return _yenc_kernel
+
+def yenc_encode_numba(data: bytes) -> bytes:
+    """yEnc-encode in one compiled pass, escaping at most every byte (2x output)"""
+    src = np.frombuffer(data, dtype=np.uint8)
+    dst = np.empty(len(src) * 2, dtype=np.uint8)
+    return dst[:load_yenc_kernel()(src, dst)].tobytes()
+
+def encode_data(data: bytes, encoding: EncodingType) -> bytes:
+    """Encode binary data using the specified encoding
+
+    Returns bytes (ASCII, or 8-bit for yEnc) so the cache pipeline never
+    round-trips through str; decode only at the response boundary.
+    """
+    if encoding in (EncodingType.BASE64, EncodingType.UUENCODE):
+        # uuencode is served as a base64-alphabet variant; real uuencode adds
+        # line framing that chunked transport can't use
+        return b64encode(data)
+    elif encoding == EncodingType.HEX:
+        # hexlify returns bytes in one C pass; bytes.hex() would need an extra
+        # encode, and NumPy/Numba lookup tables are no faster at this size
+        return binascii.hexlify(data)
+    elif encoding == EncodingType.BASE32:
+        return base64.b32encode(data)
+    elif encoding == EncodingType.BASE85:
+        return base64.b85encode(data)
+    elif encoding == EncodingType.YENC:
+        # yEnc encoding - efficient binary encoding
+        # yEnc adds 42 to each byte and escapes special characters
+        if load_yenc_kernel() is not None:
+            return yenc_encode_numba(data)
+        if np is not None:
+            return yenc_encode_numpy(data)
+        result = []
+        for byte in data:
+            # Add 42 and wrap at 256
+            encoded_byte = (byte + 42) % 256
+
+            # Escape special characters: NULL, LF, CR, =
+            if encoded_byte in [0x00, 0x0A, 0x0D, 0x3D]:
+                result.append(0x3D)  # Escape character
+                result.append((encoded_byte + 64) % 256)
+            else:
+                result.append(encoded_byte)
+
+        # yEnc uses 8-bit characters; for web transport they are decoded as latin-1
+        return bytes(result)
+    else:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+
+def encode_file_block(file_path: str, offset: int, length: int, encoding: EncodingType,
+                      tmp_path: str, out_offset: Optional[int]) -> Union[int, bytes]:
+    """Encode one aligned block of a file in a pool process
+
+    With a known output offset the block is written straight into the cache
+    file and its encoded length returned, so no data crosses the process
+    boundary; otherwise (yEnc) the encoded bytes are returned.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        data = os.pread(fd, length, offset)
+        if hasattr(os, 'posix_fadvise'):
+            # The block is read once; drop its pages (see map_and_encode_blocks in main)
+            os.posix_fadvise(fd, offset, len(data), os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    encoded = encode_data(data, encoding)
+    if out_offset is None:
+        return encoded
+
+    out_fd = os.open(tmp_path, os.O_WRONLY)
+    try:
+        view = memoryview(encoded)
+        while view:
+            written = os.pwrite(out_fd, view, out_offset)
+            view = view[written:]
+            out_offset += written
+    finally:
+        os.close(out_fd)
+    return len(encoded)
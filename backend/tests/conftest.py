@@ -0,0 +1,14 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# Tests import the backend modules the way uvicorn does, from the backend folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """The app module, imported from a scratch folder (it creates input_files/ and cache/ on import)"""
+    os.chdir(tmp_path_factory.mktemp("server"))
+    return importlib.import_module("main")
@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from encoders import EncodingType
+
+def test_failed_encode_removes_temp_file(main, monkeypatch):
+    source = os.path.join(main.INPUT_FOLDER, "tmp_cleanup.bin")
+    with open(source, "wb") as f:
+        f.write(os.urandom(5000))
+    cache_path = os.path.join(main.CACHE_FOLDER, "tmp_cleanup.base64")
+    
+    def fail_publish(tmp_path, cache_path):
+        raise OSError("simulated publish failure")
+    monkeypatch.setattr(main, "publish_cache_file", fail_publish)
+    
+    with pytest.raises(OSError, match="simulated"):
+        main.encode_file_to_cache(source, EncodingType.BASE64, cache_path)
+    assert not [name for name in os.listdir(main.CACHE_FOLDER) if name.startswith("tmp_cleanup")]
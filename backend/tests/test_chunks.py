@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from encoders import EncodingType, b64encode
+
+@pytest.fixture(scope="module")
+def chunk_file(main):
+    # 10000 bytes encode to 13336 base64 characters, so most chunk sizes leave a short last chunk
+    data = os.urandom(10000)
+    path = os.path.join(main.INPUT_FOLDER, "chunk_on_read.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+    return main.register_file(path)["file_id"], b64encode(data)
+
+@pytest.mark.parametrize("encoding", [EncodingType.BASE64, EncodingType.UUENCODE])
+@pytest.mark.parametrize("chunk_size", [1024, 4096, 5000, 13336, 16384])
+def test_chunks_encoded_on_read_match_whole_file_encoding(main, chunk_file, encoding, chunk_size):
+    file_id, encoded = chunk_file
+    client = TestClient(main.app)
+    total_chunks = -(-len(encoded) // chunk_size)
+    params = {"chunk_size": chunk_size, "encoding": encoding.value}
+    
+    chunks = []
+    for chunk_number in range(total_chunks):
+        response = client.get(f"/chunk/{file_id}/{chunk_number}", params={**params, "raw": "true"})
+        assert response.status_code == 200
+        assert response.headers["x-total-chunks"] == str(total_chunks)
+        assert response.headers["x-is-last"] == ("1" if chunk_number == total_chunks - 1 else "0")
+        chunks.append(response.content)
+    assert b"".join(chunks) == encoded
+    
+    # The JSON envelope carries the same short last chunk
+    last = client.get(f"/chunk/{file_id}/{total_chunks - 1}", params=params).json()
+    assert last["data"].encode() == encoded[(total_chunks - 1) * chunk_size:]
+    assert last["is_last"]
+    
+    assert client.get(f"/chunk/{file_id}/{total_chunks}", params=params).status_code == 404
+    assert client.get(f"/chunk/{file_id}/-1", params=params).status_code == 422
+    # Served without writing a cache file
+    assert main.get_cache_size(main.get_cache_path(file_id, encoding)) is None
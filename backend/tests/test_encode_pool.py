@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from encoders import EncodingType, encode_data
+
+@pytest.fixture(scope="module")
+def pool_main(main):
+    """main with a two-process encode pool and blocks small enough to split a test file"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(main, "ENCODE_PROCESSES", 2)
+        mp.setattr(main, "FILE_READ_CHUNK_SIZE", 30000)
+        yield main
+        if main._encode_pool is not None:
+            main.reset_encode_pool(main._encode_pool)
+
+@pytest.fixture(scope="module")
+def pool_source(pool_main):
+    # Several blocks plus an unaligned tail, with every escaped yEnc byte at block edges
+    data = bytearray(os.urandom(200003))
+    for boundary in range(0, len(data), 29999):
+        data[boundary:boundary + 4] = bytes((214, 224, 227, 19))
+    path = os.path.join(pool_main.INPUT_FOLDER, "pool_source.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path, bytes(data)
+
+@pytest.mark.parametrize("encoding", list(EncodingType))
+def test_pool_encoded_cache_matches_whole_file_encoding(pool_main, pool_source, encoding):
+    path, data = pool_source
+    cache_path = os.path.join(pool_main.CACHE_FOLDER, f"pool_source.{encoding.value}")
+    encoded_size = pool_main.encode_file_to_cache(path, encoding, cache_path)
+    
+    expected = encode_data(data, encoding)
+    with open(cache_path, "rb") as f:
+        assert f.read() == expected
+    assert encoded_size == len(expected)
+    assert pool_main._encode_pool is not None  # The blocks really went through the pool
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+from encoders import EncodingType, encode_data
+
+SIZES = list(range(0, 66)) + [1023, 1024, 1025, 3 * 1024 * 1024 + 2]
+
+@pytest.mark.parametrize("encoding", [e for e in EncodingType if e != EncodingType.YENC])
+def test_encoded_size_matches_encoder(main, encoding):
+    data = os.urandom(max(SIZES))
+    for size in SIZES:
+        assert main.get_encoded_size(size, encoding) == len(encode_data(data[:size], encoding)), size
+
+def test_yenc_size_is_unknown(main):
+    # Escapes depend on the data, so yEnc can't be sized in advance
+    assert main.get_encoded_size(1024, EncodingType.YENC) is None
@@ -0,0 +1,39 @@
+import os
+import threading
+import time
+
+from encoders import EncodingType, b64encode
+
+def wait_for_preprocess(main, file_id):
+    for _ in range(200):
+        state = main.processed_files[file_id]['preprocess_state']
+        if state in ('ready', 'failed'):
+            return state
+        time.sleep(0.02)
+    return state
+
+def test_preprocess_worker_fills_raw_cache_and_survives_errors(main, monkeypatch):
+    monkeypatch.setattr(main, "PREPROCESS_ON_REGISTER", True)
+    real_ensure = main.ensure_encoded_cache
+    def flaky_ensure(file_id, *args):
+        if main.processed_files[file_id]['filename'] == 'pre_broken.bin':
+            raise OSError("simulated disk error")
+        return real_ensure(file_id, *args)
+    monkeypatch.setattr(main, "ensure_encoded_cache", flaky_ensure)
+    threading.Thread(target=main.preprocess_worker, daemon=True).start()
+    
+    files = {}
+    for name in ('pre_broken.bin', 'pre_ok.bin'):
+        path = os.path.join(main.INPUT_FOLDER, name)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(10000))
+        files[name] = main.register_file(path)['file_id']
+    
+    # A failing file must not stop the worker from encoding the next one
+    assert wait_for_preprocess(main, files['pre_broken.bin']) == 'failed'
+    assert wait_for_preprocess(main, files['pre_ok.bin']) == 'ready'
+    with open(os.path.join(main.INPUT_FOLDER, 'pre_ok.bin'), 'rb') as f:
+        expected = b64encode(f.read())
+    cache_path = main.get_cache_path(files['pre_ok.bin'], EncodingType.BASE64)
+    with open(cache_path, 'rb') as f:
+        assert f.read() == expected
@@ -0,0 +1,37 @@
+import pytest
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-10", (10, 10)),
+    ("bytes=990-2000", (990, 999)),  # End past the file is clamped
+    ("bytes = 5-9", (5, 9)),
+    # Open-ended: from start to the end of the file
+    ("bytes=500-", (500, 999)),
+    ("bytes=0-", (0, 999)),
+    # Suffix: the last N bytes, or the whole file when N is larger
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+])
+def test_satisfiable_ranges(main, header, expected):
+    assert main.parse_byte_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-",  # Starts at the end of the file
+    "bytes=1000-1999",
+    "bytes=20-10",  # Start after end
+    "bytes=-0",  # Empty suffix
+    "bytes=0-9,20-29",  # Multi-range is not supported
+    "bytes=0-9, -5",
+    "items=0-9",  # Unknown unit
+    "bytes=abc-",
+    "bytes=-",
+    "bytes=--5",
+    "bytes=1-2-3",
+    "0-99",
+])
+def test_unsatisfiable_or_malformed_ranges(main, header):
+    assert main.parse_byte_range(header, 1000) is None
+
+def test_empty_file_has_no_satisfiable_range(main):
+    assert main.parse_byte_range("bytes=0-", 0) is None
+    assert main.parse_byte_range("bytes=-10", 0) is None
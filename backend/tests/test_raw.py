@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from encoders import b64encode
+
+@pytest.fixture
+def raw_file(main):
+    data = os.urandom(30000)
+    path = os.path.join(main.INPUT_FOLDER, "raw_range.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+    return main.register_file(path)["file_id"], b64encode(data)
+
+def test_range_response_headers_are_readable_cross_origin(main, raw_file):
+    file_id, encoded = raw_file
+    response = TestClient(main.app).get(
+        f"/raw/{file_id}", headers={"Range": "bytes=100-199", "Origin": "http://localhost:3000"})
+    assert response.status_code == 206
+    assert response.content == encoded[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(encoded)}"
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+    assert {"content-range", "accept-ranges"} <= exposed
+
+def test_range_request_reencodes_cache_evicted_after_encoding(main, raw_file, monkeypatch):
+    file_id, encoded = raw_file
+    real_ensure = main.ensure_encoded_cache
+    evicted = []
+    def ensure_then_evict(*args):
+        cache_path = real_ensure(*args)
+        if not evicted:
+            # Another request's eviction pass lands between encoding and reading
+            main.remove_cached_files(file_id)
+            evicted.append(cache_path)
+        return cache_path
+    monkeypatch.setattr(main, "ensure_encoded_cache", ensure_then_evict)
+    
+    response = TestClient(main.app).get(f"/raw/{file_id}", headers={"Range": "bytes=-50"})
+    assert evicted
+    assert response.status_code == 206
+    assert response.content == encoded[-50:]
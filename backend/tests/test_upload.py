@@ -0,0 +1,32 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def client(main):
+    return TestClient(main.app)
+
+@pytest.mark.parametrize("route", ["/upload-to-input", "/upload-raw"])
+def test_upload_registered_by_scan_first_still_succeeds(main, client, monkeypatch, route):
+    # A /files poll can register the upload between its rename and the handler's own registration
+    real_register = main.register_file
+    def register_after_scan(file_path, *args):
+        # Only the handler's call scans first; the scan's own calls register directly
+        monkeypatch.setattr(main, "register_file", real_register)
+        main.scan_input_folder(force=True)
+        return real_register(file_path, *args)
+    monkeypatch.setattr(main, "register_file", register_after_scan)
+    
+    data = os.urandom(3000)
+    filename = f"raced{route.replace('/', '_')}.bin"
+    if route == "/upload-to-input":
+        response = client.post(route, files={"file": (filename, data)})
+    else:
+        response = client.post(route, content=data, headers={"X-Filename": filename})
+    
+    assert response.status_code == 200, response.text
+    file_info = response.json()["file_info"]
+    assert file_info["filename"] == filename
+    assert file_info["original_size"] == len(data)
+    assert main.processed_files[file_info["file_id"]]["filename"] == filename
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+import encoders
+
+np = pytest.importorskip("numpy")
+
+def yenc_reference(data: bytes) -> bytes:
+    """The per-byte yEnc loop the vectorized kernels must match"""
+    result = bytearray()
+    for byte in data:
+        encoded_byte = (byte + 42) % 256
+        if encoded_byte in (0x00, 0x0A, 0x0D, 0x3D):
+            result += bytes((0x3D, (encoded_byte + 64) % 256))
+        else:
+            result.append(encoded_byte)
+    return bytes(result)
+
+# Source bytes that encode to NULL, LF, CR and '=' and so need escaping
+ESCAPED_BYTES = bytes((256 - 42, 0x0A - 42 + 256, 0x0D - 42 + 256, 0x3D - 42))
+
+def sample_data(block_size: int) -> bytes:
+    """All 256 byte values, plus escaped bytes on both sides of every block boundary"""
+    rng = random.Random(0)
+    data = bytearray(bytes(range(256)) * 3)
+    data += rng.randbytes(block_size * 3 - len(data) % block_size)
+    for boundary in range(block_size, len(data), block_size):
+        data[boundary - 2:boundary + 2] = ESCAPED_BYTES
+    return bytes(data) + ESCAPED_BYTES + rng.randbytes(17)
+
+def test_reference_escapes_every_special_byte():
+    assert yenc_reference(ESCAPED_BYTES) == b"=@=J=M=}"
+
+@pytest.mark.parametrize("block_size", [7, 256, 4096])
+def test_numpy_matches_reference_across_blocks(monkeypatch, block_size):
+    monkeypatch.setattr(encoders, "YENC_BLOCK_SIZE", block_size)
+    data = sample_data(block_size)
+    assert encoders.yenc_encode_numpy(data) == yenc_reference(data)
+
+def test_numpy_matches_reference_at_default_block_size():
+    data = sample_data(encoders.YENC_BLOCK_SIZE)
+    assert encoders.yenc_encode_numpy(data) == yenc_reference(data)
+
+def test_numpy_accepts_memoryview_and_empty_input():
+    data = bytes(range(256))
+    assert encoders.yenc_encode_numpy(memoryview(data)) == yenc_reference(data)
+    assert encoders.yenc_encode_numpy(b"") == b""
+
+@pytest.fixture(scope="module")
+def numba_kernel():
+    kernel = encoders.load_yenc_kernel()
+    if kernel is None:
+        pytest.skip("numba is not installed")
+    return kernel
+
+def test_numba_matches_reference(numba_kernel):
+    data = sample_data(encoders.YENC_BLOCK_SIZE)
+    assert encoders.yenc_encode_numba(data) == yenc_reference(data)
+
+def test_numba_blocks_concatenate_to_whole_file_encoding(numba_kernel):
+    # Pool processes encode aligned blocks independently and the cache file joins them
+    block_size = 4096
+    data = sample_data(block_size)
+    blocks = [encoders.yenc_encode_numba(data[offset:offset + block_size])
+              for offset in range(0, len(data), block_size)]
+    assert b"".join(blocks) == yenc_reference(data)
+
+def test_numba_handles_all_escapes_and_empty_input(numba_kernel):
+    # Worst case: every byte escaped fills the whole 2x output buffer
+    assert encoders.yenc_encode_numba(ESCAPED_BYTES * 1000) == yenc_reference(ESCAPED_BYTES * 1000)
+    assert encoders.yenc_encode_numba(b"") == b""
+
+def test_encode_data_uses_compiled_kernel(numba_kernel):
+    data = bytes(range(256))
+    assert encoders.encode_data(data, encoders.EncodingType.YENC) == yenc_reference(data)